@@ -0,0 +1,274 @@
+from typing import Dict, List, Optional, Tuple
+
+from algorithms.distances import INF
+
+# Integer-only kernels behind the Monte Carlo grouping planner.
+# Nodes are rows of the distance matrix D and stops come as parallel lists of
+# node indices and demands, so the hot loops never touch DeliveryRequest objects.
+
+# improvements smaller than this are rounding noise
+_EPS = 1e-9
+
+
+def route_time_idx(
+    stop_idxs: List[int],
+    demands: Optional[List[int]],
+    D: List[List[float]],
+    depot_i: int,
+    vehicle_capacity: int,
+) -> float:
+    # demands=None means every stop has demand 1
+    if not stop_idxs:
+        return 0.0
+    if vehicle_capacity <= 0:
+        return INF
+    if demands is None:
+        return _unit_route_time(stop_idxs, D, depot_i, vehicle_capacity)
+
+    total = 0.0
+    cur = depot_i
+    cap_left = vehicle_capacity
+
+    for j, demand in zip(stop_idxs, demands):
+        if demand <= 0:
+            return INF
+
+        # Not enough space — return to depot first
+        if cap_left < demand:
+            if cur != depot_i:
+                total += D[cur][depot_i]
+                cur = depot_i
+            cap_left = vehicle_capacity
+
+        # Go to the request node
+        total += D[cur][j]
+        cur = j
+        cap_left -= demand
+
+    # Return to the depot at the end
+    if cur != depot_i:
+        total += D[cur][depot_i]
+
+    return total
+
+
+def _unit_route_time(
+    stop_idxs: List[int],
+    D: List[List[float]],
+    depot_i: int,
+    vehicle_capacity: int,
+) -> float:
+    # With unit demands the load before stop k is k, so trips are simply
+    # consecutive blocks of vehicle_capacity stops and no running load is needed.
+    total = 0.0
+    cur = depot_i
+
+    for k, j in enumerate(stop_idxs):
+        if k and not k % vehicle_capacity:
+            total += D[cur][depot_i]
+            cur = depot_i
+        total += D[cur][j]
+        cur = j
+
+    return total + D[cur][depot_i]
+
+
+def neighbor_order(D: List[List[float]]) -> List[List[int]]:
+    # row a lists every node by increasing travel time from a (an argsort of D[a])
+    return [sorted(range(len(row)), key=row.__getitem__) for row in D]
+
+
+def nn_order_idx(
+    depot_i: int,
+    cand_idxs: List[int],
+    D: List[List[float]],
+    nn_sorted: Optional[List[List[int]]] = None,
+) -> List[int]:
+    # returns positions into cand_idxs in nearest-neighbor visiting order
+    # Walking a presorted row wins once the group is large compared to the table;
+    # for the usual handful of stops a direct scan is cheaper.
+    if nn_sorted is not None and len(cand_idxs) ** 2 > 6 * len(D):
+        return _nn_order_sorted(depot_i, cand_idxs, D, nn_sorted)
+
+    nodes = list(cand_idxs)
+    positions = list(range(len(nodes)))
+    cur = depot_i
+    order: List[int] = []
+
+    while nodes:
+        best_idx = 0
+        best_t = INF
+        row = D[cur]
+
+        for i, node in enumerate(nodes):
+            t = row[node]
+            if t < best_t:
+                best_t = t
+                best_idx = i
+
+        order.append(positions.pop(best_idx))
+        cur = nodes.pop(best_idx)
+
+    return order
+
+
+def _nn_order_sorted(
+    depot_i: int,
+    cand_idxs: List[int],
+    D: List[List[float]],
+    nn_sorted: List[List[int]],
+) -> List[int]:
+    # same order as the direct scan: several requests can share a node and are
+    # served in their original order, and equally distant nodes go to the one
+    # holding the earliest candidate position
+    pending: Dict[int, List[int]] = {}
+    for pos, node in enumerate(cand_idxs):
+        pending.setdefault(node, []).append(pos)
+
+    cur = depot_i
+    order: List[int] = []
+
+    while pending:
+        row = D[cur]
+        best_node = -1
+        best_t = INF
+        # first still-unvisited candidate along cur's sorted row, then the rest
+        # of its tie run
+        for node in nn_sorted[cur]:
+            if node not in pending:
+                continue
+            t = row[node]
+            if best_node < 0:
+                best_node, best_t = node, t
+            elif t != best_t:
+                break
+            elif pending[node][0] < pending[best_node][0]:
+                best_node = node
+
+        positions = pending[best_node]
+        order.append(positions.pop(0))
+        if not positions:
+            del pending[best_node]
+        cur = best_node
+
+    return order
+
+
+def _trip_layout(
+    nodes: List[int],
+    demands: Optional[List[int]],
+    D: List[List[float]],
+    depot_i: int,
+    vehicle_capacity: int,
+) -> Tuple[List[int], List[int], List[float]]:
+    # Splits a non-empty visiting order into trips under route_time_idx's
+    # refill rule: trip number of each stop, first position of each trip, and
+    # before[t] = time of all trips ahead of trip t (before[-1] is the route).
+    trip: List[int] = []
+    first: List[int] = []
+    trip_time: List[float] = []
+    cap_left = 0
+    cur = depot_i
+
+    for k, j in enumerate(nodes):
+        demand = 1 if demands is None else demands[k]
+        if not first or cap_left < demand:
+            if first:
+                trip_time[-1] += D[cur][depot_i]
+            first.append(k)
+            trip_time.append(0.0)
+            cap_left = vehicle_capacity
+            cur = depot_i
+        trip.append(len(first) - 1)
+        trip_time[-1] += D[cur][j]
+        cur = j
+        cap_left -= demand
+    trip_time[-1] += D[cur][depot_i]
+
+    before = [0.0]
+    for t in trip_time:
+        before.append(before[-1] + t)
+    return trip, first, before
+
+
+def two_opt_idx(
+    order: List[int],
+    stop_idxs: List[int],
+    demands: Optional[List[int]],
+    D: List[List[float]],
+    depot_i: int,
+    vehicle_capacity: int,
+    max_passes: int = 1,
+) -> Tuple[List[int], float]:
+    # Improves a visiting order (positions into stop_idxs/demands) by segment
+    # reversals inside one trip, first improvement, at most max_passes sweeps.
+    # Such a reversal keeps the trip's load, so no refill moves and only the
+    # two end edges plus the direction of the segment change: an O(1) delta
+    # with running sums. The one exception is a trip's first stop, which may
+    # then fit on the trip before; that case is priced with route_time_idx.
+    def price(o: List[int]) -> float:
+        return route_time_idx(
+            [stop_idxs[k] for k in o],
+            None if demands is None else [demands[k] for k in o],
+            D,
+            depot_i,
+            vehicle_capacity,
+        )
+
+    best = price(order)
+    n = len(order)
+    if n < 2 or best >= INF:
+        return order, best
+
+    order = list(order)
+    nodes = [stop_idxs[k] for k in order]
+    dems = None if demands is None else [demands[k] for k in order]
+    trip, first, before = _trip_layout(nodes, dems, D, depot_i, vehicle_capacity)
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            fwd = rev = 0.0
+            for j in range(i + 1, n):
+                # travel along nodes[i..j] forwards and backwards
+                fwd += D[nodes[j - 1]][nodes[j]]
+                rev += D[nodes[j]][nodes[j - 1]]
+                ti = trip[i]
+                if trip[j] != ti:
+                    # the segment crosses a refill; leave trip membership alone
+                    break
+
+                if dems is not None and ti and i == first[ti] and (
+                    sum(dems[first[ti - 1]:i]) + dems[j] <= vehicle_capacity
+                ):
+                    # stop j would fit into the room left on the trip before,
+                    # so the refills move: price from that trip on
+                    s = first[ti - 1]
+                    old = before[-1] - before[ti - 1]
+                    new = route_time_idx(
+                        nodes[s:i] + nodes[i:j + 1][::-1] + nodes[j + 1:],
+                        dems[s:i] + dems[i:j + 1][::-1] + dems[j + 1:],
+                        D, depot_i, vehicle_capacity,
+                    )
+                    if new - old >= -_EPS:
+                        continue
+                else:
+                    a = nodes[i - 1] if i and trip[i - 1] == ti else depot_i
+                    d = nodes[j + 1] if j + 1 < n and trip[j + 1] == ti else depot_i
+                    b, c = nodes[i], nodes[j]
+                    delta = D[a][c] + rev + D[b][d] - D[a][b] - fwd - D[c][d]
+                    if delta >= -_EPS:
+                        continue
+
+                order[i:j + 1] = order[i:j + 1][::-1]
+                nodes[i:j + 1] = nodes[i:j + 1][::-1]
+                if dems is not None:
+                    dems[i:j + 1] = dems[i:j + 1][::-1]
+                trip, first, before = _trip_layout(nodes, dems, D, depot_i, vehicle_capacity)
+                fwd, rev = rev, fwd
+                improved = True
+        if not improved:
+            break
+
+    # before[-1] sums per trip; report the time exactly as route_time_idx adds it
+    return order, price(order)
@@ -21,18 +21,16 @@ def _reconstruct_path(
     return rev
 
 
-def astar_shortest_path(
+def _astar_search(
     graph: CityGraph,
     start: NodeId,
     goal: NodeId,
-) -> Tuple[Optional[Path], float]:
-    if start == goal:
-        return [start], 0.0
-
+    came_from: Optional[Dict[NodeId, NodeId]],
+) -> Optional[float]:
+    # parents are recorded into came_from only when the caller needs the path
     open_set: List[Tuple[float, NodeId]] = []
     heapq.heappush(open_set, (0.0, start))
 
-    came_from: Dict[NodeId, NodeId] = {}
     g_score: Dict[NodeId, float] = {start: 0.0}
     closed: Set[NodeId] = set()
 
@@ -41,7 +39,7 @@ def astar_shortest_path(
         if current in closed:
             continue
         if current == goal:
-            return _reconstruct_path(came_from, start, goal), g_score[current]
+            return g_score[current]
 
         closed.add(current)
 
@@ -51,9 +49,63 @@ def astar_shortest_path(
             if neighbor in g_score and tentative_g >= g_score[neighbor]:
                 continue
 
-            came_from[neighbor] = current
+            if came_from is not None:
+                came_from[neighbor] = current
             g_score[neighbor] = tentative_g
             f_score = tentative_g + graph.heuristic_time(neighbor, goal)
             heapq.heappush(open_set, (f_score, neighbor))
 
-    return None, float("inf")
+    return None
+
+
+def astar_shortest_path(
+    graph: CityGraph,
+    start: NodeId,
+    goal: NodeId,
+) -> Tuple[Optional[Path], float]:
+    if start == goal:
+        return [start], 0.0
+
+    came_from: Dict[NodeId, NodeId] = {}
+    cost = _astar_search(graph, start, goal, came_from)
+    if cost is None:
+        return None, float("inf")
+    return _reconstruct_path(came_from, start, goal), cost
+
+
+def astar_shortest_cost(
+    graph: CityGraph,
+    start: NodeId,
+    goal: NodeId,
+) -> Optional[float]:
+    # same search as astar_shortest_path, for callers that only need the
+    # travel time: no parent map, no path reconstruction; None if unreachable
+    if start == goal:
+        return 0.0
+    return _astar_search(graph, start, goal, None)
+
+
+def dijkstra_from(
+    graph: CityGraph,
+    start: NodeId,
+) -> Dict[NodeId, float]:
+    # travel time from start to every reachable node, in one expansion
+    dist: Dict[NodeId, float] = {start: 0.0}
+    open_set: List[Tuple[float, NodeId]] = [(0.0, start)]
+    closed: Set[NodeId] = set()
+
+    while open_set:
+        d, current = heapq.heappop(open_set)
+        if current in closed:
+            continue
+        closed.add(current)
+
+        for edge in graph.neighbors(current):
+            neighbor = edge.dst
+            tentative = d + edge.base_travel_time
+            if neighbor in dist and tentative >= dist[neighbor]:
+                continue
+            dist[neighbor] = tentative
+            heapq.heappush(open_set, (tentative, neighbor))
+
+    return dist
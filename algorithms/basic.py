@@ -1,9 +1,20 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+import heapq
+from typing import List, Dict, Optional, Tuple
 
 from city.graph import CityGraph, NodeId
 from domain.models import Vehicle, DeliveryRequest, VehicleRoute, Plan
-from algorithms.a_star import astar_shortest_path
+from algorithms.distances import (
+    INF,
+    DistanceMatrix,
+    NodeIndex,
+    PlannerContext,
+    resolve_planner_context,
+)
+
+
+# (time spent so far without the return leg, current node index, capacity left)
+VehicleState = Tuple[float, int, int]
 
 
 @dataclass
@@ -17,13 +28,15 @@ class GreedyVRPPlanner:
 
     def _route_cost(
         self,
-        graph: CityGraph,
+        D: DistanceMatrix,
+        idx: NodeIndex,
         vehicle: Vehicle,
         stops: List[DeliveryRequest],
         depot: NodeId,
         return_to_depot: bool = True,
     ) -> float:
-        cur = vehicle.start_node
+        depot_i = idx[depot]
+        cur = idx[vehicle.start_node]
         t = 0.0
         cap = vehicle.capacity
         if cap <= 0:
@@ -38,37 +51,70 @@ class GreedyVRPPlanner:
 
             # If the next request does not fit -> go back to depot first
             if cap_left < demand:
-                if cur != depot:
-                    path, travel = astar_shortest_path(graph, cur, depot)
-                    if path is None:
+                if cur != depot_i:
+                    travel = D[cur][depot_i]
+                    if travel >= INF:
                         return float("inf")
                     t += travel
-                    cur = depot
+                    cur = depot_i
                 cap_left = cap
 
             # Travel to the request node
-            path, travel = astar_shortest_path(graph, cur, req.node)
-            if path is None:
+            j = idx[req.node]
+            travel = D[cur][j]
+            if travel >= INF:
                 return float("inf")
             t += travel
-            cur = req.node
+            cur = j
             cap_left -= demand
 
         # Return to depot at the end if requested
-        if return_to_depot and cur != depot:
-            path, travel = astar_shortest_path(graph, cur, depot)
-            if path is None:
+        if return_to_depot and cur != depot_i:
+            travel = D[cur][depot_i]
+            if travel >= INF:
                 return float("inf")
             t += travel
 
         return t
 
+    def _append_cost(
+        self,
+        D: DistanceMatrix,
+        state: VehicleState,
+        node_i: int,
+        demand: int,
+        depot_i: int,
+        cap: int,
+    ) -> Tuple[float, VehicleState]:
+        # Same rules as _route_cost, but only for the one new stop (table
+        # index node_i) on top of an already evaluated prefix. Returns the full
+        # route cost (with the return leg) and the state after serving it.
+        t, cur, cap_left = state
+        if cap <= 0 or demand <= 0:
+            return float("inf"), state
+
+        if cap_left < demand:
+            if cur != depot_i:
+                t += D[cur][depot_i]
+                cur = depot_i
+            cap_left = cap
+
+        t += D[cur][node_i]
+        cur = node_i
+        cap_left -= demand
+
+        back = D[cur][depot_i] if cur != depot_i else 0.0
+        if t >= INF or back >= INF:
+            return float("inf"), state
+        return t + back, (t, cur, cap_left)
+
     def build_plan(
         self,
         graph: CityGraph,
         depot: NodeId,
         vehicles: List[Vehicle],
         requests: List[DeliveryRequest],
+        ctx: Optional[PlannerContext] = None,
     ) -> PlanCost:
 
         # each request must fit into at least one vehicle
@@ -80,37 +126,70 @@ class GreedyVRPPlanner:
                     f"but no vehicle can carry it in a single trip"
                 )
 
-        remaining = requests[:]
+        # Travel-time table over depot, vehicle start nodes and request nodes
+        # (or reuse the caller's)
+        ctx = resolve_planner_context(ctx, graph, depot, vehicles, requests)
+        D, idx = ctx.D, ctx.idx
+
         routes: Dict[str, VehicleRoute] = {
             v.id: VehicleRoute(vehicle_id=v.id) for v in vehicles
         }
+        vehicle_state: Dict[str, VehicleState] = {
+            v.id: (0.0, idx[v.start_node], v.capacity) for v in vehicles
+        }
 
-        while remaining:
-            best_choice: Optional[tuple[str, DeliveryRequest, float]] = None
-
-            for req in remaining:
-                demand = getattr(req, "demand", 1)
-                for v in vehicles:
-                    # Vehicle must be able to carry this request at least in theory
-                    if v.capacity < demand:
-                        continue
+        # Translate node ids and demands to plain ints once; the candidate
+        # loop below only works with table indices
+        depot_i = idx[depot]
+        req_nodes = [idx[r.node] for r in requests]
+        req_demands = [getattr(r, "demand", 1) for r in requests]
+
+        # Min-heap of candidate insertions: (cost, request index, vehicle position,
+        # generation, vehicle id, new state). Ties resolve by request, then vehicle
+        # order, exactly like the full rescan this replaced. After a vehicle takes
+        # a request only its own candidates change, so its generation is bumped
+        # and older entries are dropped lazily when popped.
+        remaining = set(range(len(requests)))
+        generation: Dict[str, int] = {v.id: 0 for v in vehicles}
+        heap: List[tuple[float, int, int, int, str, VehicleState]] = []
+        v_pos = {v.id: k for k, v in enumerate(vehicles)}
+
+        def push_candidates(v: Vehicle, req_indices) -> None:
+            for i in req_indices:
+                # Vehicle must be able to carry this request at least in theory
+                if v.capacity < req_demands[i]:
+                    continue
+                cost, new_state = self._append_cost(
+                    D, vehicle_state[v.id], req_nodes[i], req_demands[i], depot_i, v.capacity
+                )
+                heapq.heappush(
+                    heap, (cost, i, v_pos[v.id], generation[v.id], v.id, new_state)
+                )
 
-                    stops = routes[v.id].stops + [req]
-                    cost = self._route_cost(graph, v, stops, depot)
-                    if best_choice is None or cost < best_choice[2]:
-                        best_choice = (v.id, req, cost)
+        for i in range(len(requests)):
+            for v in vehicles:
+                push_candidates(v, [i])
 
-            if best_choice is None:
+        v_index = {v.id: v for v in vehicles}
+        while remaining:
+            if not heap:
                 # Should never happen because we checked demand <= max capacity
                 raise RuntimeError("Cannot build feasible greedy plan (no vehicle can take remaining requests)")
 
-            vid, chosen_req, _ = best_choice
-            routes[vid].stops.append(chosen_req)
-            remaining.remove(chosen_req)
+            _, i, _, gen, vid, new_state = heapq.heappop(heap)
+            if i not in remaining or gen != generation[vid]:
+                continue
+
+            routes[vid].stops.append(requests[i])
+            vehicle_state[vid] = new_state
+            remaining.remove(i)
+
+            generation[vid] += 1
+            push_candidates(v_index[vid], sorted(remaining))
 
         total_time = 0.0
         for v in vehicles:
-            total_time += self._route_cost(graph, v, routes[v.id].stops, depot)
+            total_time += self._route_cost(D, idx, v, routes[v.id].stops, depot)
 
         return PlanCost(
             plan=Plan(depot=depot, routes=routes),
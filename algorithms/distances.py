@@ -0,0 +1,112 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from city.graph import CityGraph, NodeId
+from domain.models import Vehicle, DeliveryRequest
+from algorithms.a_star import dijkstra_from
+
+
+# travel time between nodes that are not connected
+INF = 10**18
+
+# Travel times as D[idx[a]][idx[b]]; rows are plain lists so a lookup is two
+# list indexings instead of hashing a (NodeId, NodeId) tuple
+DistanceMatrix = List[List[float]]
+NodeIndex = Dict[NodeId, int]
+
+
+# Below this much work (sources x graph nodes) a process pool costs more to
+# start than it saves
+PARALLEL_MIN_WORK = 200_000
+
+_worker_graph: Optional[CityGraph] = None
+
+
+def _init_worker(graph: CityGraph) -> None:
+    # the graph is sent once per worker process instead of once per source
+    global _worker_graph
+    _worker_graph = graph
+
+
+def _dijkstra_worker(src: NodeId) -> Dict[NodeId, float]:
+    return dijkstra_from(_worker_graph, src)
+
+
+def precompute_distances(
+    graph: CityGraph,
+    depot: NodeId,
+    requests: List[DeliveryRequest],
+    extra_nodes: Iterable[NodeId] = (),
+    workers: Optional[int] = None,
+) -> Tuple[DistanceMatrix, NodeIndex]:
+    # extra_nodes: additional points (e.g. vehicle start nodes) to include in the table
+    # workers: process pool size for large tables (None = CPU count, 1 = never parallel)
+    nodes: List[NodeId] = list(dict.fromkeys(
+        [depot] + [r.node for r in requests] + list(extra_nodes)
+    ))
+
+    # one Dijkstra per table node reaches all the others in a single expansion,
+    # instead of one A* query per pair
+    if workers != 1 and len(nodes) * len(graph.nodes) >= PARALLEL_MIN_WORK:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(graph,),
+        ) as ex:
+            reached = list(ex.map(_dijkstra_worker, nodes, chunksize=8))
+    else:
+        reached = [dijkstra_from(graph, a) for a in nodes]
+
+    idx: NodeIndex = {nid: i for i, nid in enumerate(nodes)}
+    D: DistanceMatrix = [
+        [times.get(b, INF) for b in nodes]
+        for times in reached
+    ]
+    return D, idx
+
+
+@dataclass
+class PlannerContext:
+    # Travel-time table shared by planners that run on the same graph, depot,
+    # fleet and requests, so the table is built once instead of per planner.
+    D: DistanceMatrix
+    idx: NodeIndex
+    graph: CityGraph
+
+
+def build_planner_context(
+    graph: CityGraph,
+    depot: NodeId,
+    vehicles: List[Vehicle],
+    requests: List[DeliveryRequest],
+    workers: Optional[int] = None,
+) -> PlannerContext:
+    # covers the depot, every request node and every vehicle start node
+    D, idx = precompute_distances(
+        graph, depot, requests,
+        extra_nodes=[v.start_node for v in vehicles],
+        workers=workers,
+    )
+    return PlannerContext(D=D, idx=idx, graph=graph)
+
+
+def resolve_planner_context(
+    ctx: Optional[PlannerContext],
+    graph: CityGraph,
+    depot: NodeId,
+    vehicles: List[Vehicle],
+    requests: List[DeliveryRequest],
+) -> PlannerContext:
+    # builds a context if none was given, otherwise checks that it fits this call
+    if ctx is None:
+        return build_planner_context(graph, depot, vehicles, requests)
+
+    if ctx.graph is not graph:
+        raise ValueError("PlannerContext was built for a different graph")
+    needed = [depot] + [r.node for r in requests] + [v.start_node for v in vehicles]
+    missing = [nid for nid in needed if nid not in ctx.idx]
+    if missing:
+        raise ValueError(f"PlannerContext has no travel times for nodes {missing}")
+    return ctx
@@ -1,189 +1,265 @@
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+import math
 import random
 
 from city.graph import CityGraph, NodeId
 from domain.models import Vehicle, DeliveryRequest, VehicleRoute, Plan
-from algorithms.a_star import astar_shortest_path
-
-INF = 10**18
-
-
-def _compute_time(
-    graph: CityGraph,
-    src: NodeId,
-    dst: NodeId,
-) -> float:
-    if src == dst:
-        return 0.0
-    path, cost = astar_shortest_path(graph, src, dst)
-    if path is None:
-        return INF
-    return cost
-
-
-def precompute_distances(
-    graph: CityGraph,
-    depot: NodeId,
-    requests: List[DeliveryRequest],
-) -> Dict[Tuple[NodeId, NodeId], float]:
-    nodes: List[NodeId] = [depot] + [r.node for r in requests]
-    dist: Dict[Tuple[NodeId, NodeId], float] = {}
-    for a in nodes:
-        for b in nodes:
-            if (a, b) in dist:
-                continue
-            t = _compute_time(graph, a, b)
-            dist[(a, b)] = t
-            dist[(b, a)] = t
-    return dist
+from algorithms.distances import (
+    INF,
+    DistanceMatrix,
+    NodeIndex,
+    PlannerContext,
+    resolve_planner_context,
+)
+from algorithms._fast import (
+    neighbor_order,
+    nn_order_idx,
+    route_time_idx,
+    two_opt_idx,
+)
 
 
 def route_time(
     depot: NodeId,
     stops: List[DeliveryRequest],
-    dist: Dict[Tuple[NodeId, NodeId], float],
+    D: DistanceMatrix,
+    idx: NodeIndex,
     vehicle_capacity: int,
 ) -> float:
     #updated to have capacity feature handling
-    if not stops:
-        return 0.0
-    if vehicle_capacity <= 0:
-        return INF
+    return route_time_idx(
+        [idx[r.node] for r in stops],
+        [getattr(r, "demand", 1) for r in stops],
+        D,
+        idx[depot],
+        vehicle_capacity,
+    )
 
-    total = 0.0
-    cur = depot
-    cap_left = vehicle_capacity
 
-    for r in stops:
-        demand = getattr(r, "demand", 1)
-        if demand <= 0:
-            return INF
+# assignment[i] = position in `vehicles` of the vehicle serving requests[i]
+Assignment = List[int]
 
-        # Not enough space — return to depot first
-        if cap_left < demand:
-            if cur != depot:
-                total += dist[(cur, depot)]
-                cur = depot
-            cap_left = vehicle_capacity
 
-        # Go to the request node
-        total += dist[(cur, r.node)]
-        cur = r.node
-        cap_left -= demand
+def init_assignment_random(
+    n_vehicles: int,
+    n_requests: int,
+    rng: random.Random,
+) -> Assignment:
+    # simply distribute requests across vehicles uniformly/randomly
+    return [rng.randrange(n_vehicles) for _ in range(n_requests)]
 
-    # Return to the depot at the end
-    if cur != depot:
-        total += dist[(cur, depot)]
 
-    return total
+# (vehicle capacity, request indices in the group) -> route time of that group
+GroupCostCache = Dict[Tuple[int, Tuple[int, ...]], float]
 
 
+def group_of(assignment: Assignment, v_i: int) -> Tuple[int, ...]:
+    # sorted by construction, so it doubles as a canonical cache key
+    return tuple(i for i, a in enumerate(assignment) if a == v_i)
 
 
-def build_tsp_route_nearest_neighbor(
-    depot: NodeId,
+def request_tables(
     requests: List[DeliveryRequest],
-    dist: Dict[Tuple[NodeId, NodeId], float],
-) -> List[DeliveryRequest]:
-    if not requests:
-        return []
-
-    remaining = list(requests)
-    cur = depot
-    route: List[DeliveryRequest] = []
-
-    while remaining:
-        best_idx = 0
-        best_t = INF
-
-        for i, r in enumerate(remaining):
-            t = dist[(cur, r.node)]
-            if t < best_t:
-                best_t = t
-                best_idx = i
-
-        chosen = remaining.pop(best_idx)
-        route.append(chosen)
-        cur = chosen.node
-
-    return route
+    idx: NodeIndex,
+) -> Tuple[List[int], Optional[List[int]]]:
+    # table index and demand per request position; demands are None when
+    # every request has demand 1 so the kernels can take the unit fast path
+    req_nodes = [idx[r.node] for r in requests]
+    req_demands: Optional[List[int]] = [getattr(r, "demand", 1) for r in requests]
+    if all(d == 1 for d in req_demands):
+        req_demands = None
+    return req_nodes, req_demands
+
+
+def group_route(
+    depot_i: int,
+    vehicle_capacity: int,
+    group: Tuple[int, ...],
+    req_nodes: List[int],
+    req_demands: Optional[List[int]],
+    D: DistanceMatrix,
+    nn_sorted: Optional[List[List[int]]] = None,
+) -> Tuple[List[int], float]:
+    # visiting order (request positions) and route time of one group.
+    # Nearest-neighbor ties depend on the candidate order, so the group is
+    # always walked in request-position order; the search and the final plan
+    # both go through here and agree on every route.
+    group = tuple(sorted(group))
+    stop_idxs = [req_nodes[i] for i in group]
+    demands = None if req_demands is None else [req_demands[i] for i in group]
+    order = nn_order_idx(depot_i, stop_idxs, D, nn_sorted)
+    order, cost = two_opt_idx(order, stop_idxs, demands, D, depot_i, vehicle_capacity)
+    return [group[k] for k in order], cost
+
+
+def group_cost(
+    depot_i: int,
+    vehicle_capacity: int,
+    group: Tuple[int, ...],
+    req_nodes: List[int],
+    req_demands: Optional[List[int]],
+    D: DistanceMatrix,
+    cache: Optional[GroupCostCache] = None,
+    nn_sorted: Optional[List[List[int]]] = None,
+) -> float:
+    # req_nodes / req_demands: see request_tables
+    # every vehicle starts from the depot here, so the cost of a group only
+    # depends on the capacity and on which requests are in it
+    if vehicle_capacity <= 0:
+        return INF
+    if not group:
+        return 0.0
 
+    key = (vehicle_capacity, group)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
+    _, cost = group_route(
+        depot_i, vehicle_capacity, group, req_nodes, req_demands, D, nn_sorted
+    )
 
-State = Dict[str, List[DeliveryRequest]]
+    if cache is not None:
+        cache[key] = cost
+    return cost
 
 
-def init_state_random(
-    vehicles: List[Vehicle],
-    requests: List[DeliveryRequest],
+def random_move_inplace(
+    assignment: Assignment,
+    n_vehicles: int,
     rng: random.Random,
-) -> State:
-    state: State = {v.id: [] for v in vehicles}
-
-    shuffled = requests[:]
-    rng.shuffle(shuffled)
-
-    # simply distribute requests across vehicles uniformly/randomly
-    for req in shuffled:
-        v = rng.choice(vehicles)
-        state[v.id].append(req)
-
-    return state
-
-
-
-
-def evaluate_state(
+) -> Tuple[int, int, int]:
+    # moves one request to another vehicle and returns (request, old vehicle, new vehicle);
+    # undo with assignment[request] = old vehicle
+    r_i = rng.randrange(len(assignment))
+    old_v = assignment[r_i]
+    if n_vehicles < 2:
+        return r_i, old_v, old_v
+
+    new_v = rng.randrange(n_vehicles - 1)
+    if new_v >= old_v:
+        new_v += 1
+    assignment[r_i] = new_v
+    return r_i, old_v, new_v
+
+
+def _hill_climb(
+    rng: random.Random,
+    iterations: int,
     depot: NodeId,
     vehicles: List[Vehicle],
-    state: State,
-    dist: Dict[Tuple[NodeId, NodeId], float],
-) -> float:
-    makespan = 0.0
+    requests: List[DeliveryRequest],
+    D: DistanceMatrix,
+    idx: NodeIndex,
+    t0: float = 0.0,
+    alpha: float = 1.0,
+    patience: Optional[int] = None,
+    batch_size: int = 1,
+) -> Tuple[float, Assignment]:
+    # one search chain; the best state is returned as a plain int list so it
+    # can cross a process boundary cheaply
+    # t0/alpha: simulated-annealing start temperature (fraction of the initial
+    # makespan) and geometric cooling, t0 = 0 is plain hill climbing;
+    # patience: stop after that many iterations without a new best;
+    # batch_size: moves tried per iteration, the cheapest one goes to acceptance
+    depot_i = idx[depot]
+    req_nodes, req_demands = request_tables(requests, idx)
+    capacity = [v.capacity for v in vehicles]
+    n_vehicles = len(vehicles)
+    nn_sorted = neighbor_order(D)
+
+    # Group costs seen so far; moves only touch two vehicles, so most groups repeat
+    cache: GroupCostCache = {}
+
+    def cost_of(v_i: int) -> float:
+        group = group_of(assignment, v_i)
+        return group_cost(
+            depot_i, capacity[v_i], group, req_nodes, req_demands, D, cache, nn_sorted
+        )
+
+    # Initialization
+    assignment = init_assignment_random(n_vehicles, len(requests), rng)
+    costs = [cost_of(v_i) for v_i in range(n_vehicles)]
+    current_cost = max(costs, default=0.0)
+    best_cost = current_cost
+    best_assignment = assignment[:]
+    temperature = t0 * current_cost if current_cost < INF else 0.0
+    last_improvement = 0
+
+    for it in range(iterations):
+        if patience is not None and it - last_improvement >= patience:
+            break
+
+        temperature *= alpha
+
+        # try batch_size moves from the current state and keep the cheapest
+        best_move = None
+        for _ in range(batch_size):
+            r_i, old_v, new_v = random_move_inplace(assignment, n_vehicles, rng)
+            if old_v == new_v:
+                continue
 
-    for v in vehicles:
-        if v.capacity <= 0:
-            return INF
+            # only the two vehicles touched by the move need a new cost
+            prev_old, prev_new = costs[old_v], costs[new_v]
+            costs[old_v] = cost_of(old_v)
+            costs[new_v] = cost_of(new_v)
+            cand_cost = max(costs)
+            if best_move is None or cand_cost < best_move[0]:
+                best_move = (cand_cost, r_i, old_v, new_v, costs[old_v], costs[new_v])
 
-        reqs = state[v.id]
-        if not reqs:
-            continue
+            assignment[r_i] = old_v
+            costs[old_v], costs[new_v] = prev_old, prev_new
 
-        order = build_tsp_route_nearest_neighbor(depot, reqs, dist)
-        cost = route_time(depot, order, dist, v.capacity)
-        makespan = max(makespan, cost)
+        if best_move is None:
+            continue
+        cand_cost, r_i, old_v, new_v, cost_old, cost_new = best_move
 
-    return makespan
+        # Metropolis acceptance: never worse moves always, worse ones with
+        # probability exp(-delta / T) while the temperature is above zero
+        delta = cand_cost - current_cost
+        if delta <= 0 or (
+            temperature > 0 and rng.random() < math.exp(-delta / temperature)
+        ):
+            assignment[r_i] = new_v
+            costs[old_v], costs[new_v] = cost_old, cost_new
+            current_cost = cand_cost
 
+            if cand_cost < best_cost:
+                best_cost = cand_cost
+                best_assignment = assignment[:]
+                last_improvement = it
 
+    return best_cost, best_assignment
 
 
-def random_move(
-    state: State,
+def _run_chain(
+    seed: int,
+    iterations: int,
+    depot: NodeId,
     vehicles: List[Vehicle],
-    rng: random.Random,
-) -> State:
-    new_state: State = {vid: lst[:] for vid, lst in state.items()}
-    v_ids = [v.id for v in vehicles]
-
-    from_vid = rng.choice(v_ids)
-    if not new_state[from_vid]:
-        return new_state
-
-    r_idx = rng.randrange(len(new_state[from_vid]))
-    req = new_state[from_vid].pop(r_idx)
-
-    to_candidates = [vid for vid in v_ids if vid != from_vid]
-    if not to_candidates:
-        new_state[from_vid].append(req)
-        return new_state
+    requests: List[DeliveryRequest],
+    D: DistanceMatrix,
+    idx: NodeIndex,
+    t0: float,
+    alpha: float,
+    patience: Optional[int],
+    batch_size: int,
+) -> Tuple[float, Assignment]:
+    return _hill_climb(
+        random.Random(seed), iterations, depot, vehicles, requests, D, idx,
+        t0, alpha, patience, batch_size,
+    )
 
-    to_vid = rng.choice(to_candidates)
-    new_state[to_vid].append(req)
 
-    return new_state
+# Annealing schedule: start temperature as a fraction of the initial
+# makespan, cooled geometrically each iteration
+T0_DEFAULT = 0.05
+ALPHA_DEFAULT = 0.998
 
 
 @dataclass
@@ -194,9 +270,26 @@ class GroupingResult:
 
 class MonteCarloGroupingPlanner:
     # optimized requests by groups using montecarlo
-    def __init__(self, rng: random.Random, iterations: int = 2000) -> None:
+    def __init__(
+        self,
+        rng: random.Random,
+        iterations: int = 2000,
+        chains: int = 1,
+        t0: float = T0_DEFAULT,
+        alpha: float = ALPHA_DEFAULT,
+        patience: Optional[int] = None,
+        batch_size: int = 1,
+    ) -> None:
+        # chains > 1 runs that many searches in a process pool and keeps the best
+        # t0 = 0 turns annealing off (pure hill climbing)
+        # batch_size > 1 tries that many moves per iteration and keeps the cheapest
         self.rng = rng
         self.iterations = iterations
+        self.chains = chains
+        self.t0 = t0
+        self.alpha = alpha
+        self.patience = patience
+        self.batch_size = batch_size
 
     def build_plan(
         self,
@@ -204,6 +297,7 @@ class MonteCarloGroupingPlanner:
         depot: NodeId,
         vehicles: List[Vehicle],
         requests: List[DeliveryRequest],
+        ctx: Optional[PlannerContext] = None,
     ) -> GroupingResult:
         if not requests:
             routes = {
@@ -213,38 +307,52 @@ class MonteCarloGroupingPlanner:
             return GroupingResult(plan=Plan(depot=depot, routes=routes),
                                   makespan_estimate=0.0)
 
-        # Precompute travel-time matrix
-        dist = precompute_distances(graph, depot, requests)
+        # Precompute travel-time matrix (or reuse the caller's)
+        ctx = resolve_planner_context(ctx, graph, depot, vehicles, requests)
+        D, idx = ctx.D, ctx.idx
 
-        # Initialization
-        state = init_state_random(vehicles, requests, self.rng)
-        best_state = state
-        best_cost = evaluate_state(depot, vehicles, state, dist)
-
-        current_state = state
-        current_cost = best_cost
-
-        for it in range(self.iterations):
-            candidate = random_move(current_state, vehicles, self.rng)
-            cand_cost = evaluate_state(depot, vehicles, candidate, dist)
-
-            # simple hill climbing: accept if not worse
-            if cand_cost <= current_cost:
-                current_state = candidate
-                current_cost = cand_cost
-
-                if cand_cost < best_cost:
-                    best_cost = cand_cost
-                    best_state = candidate
-
-        # Build the final Plan from best_state
+        if self.chains <= 1:
+            best_cost, best_assignment = _hill_climb(
+                self.rng, self.iterations, depot, vehicles, requests, D, idx,
+                self.t0, self.alpha, self.patience, self.batch_size,
+            )
+        else:
+            # independent restarts in separate processes, split the iteration budget
+            seeds = [self.rng.randrange(2**32) for _ in range(self.chains)]
+            per_chain = [
+                self.iterations // self.chains + (1 if k < self.iterations % self.chains else 0)
+                for k in range(self.chains)
+            ]
+            with ProcessPoolExecutor(max_workers=self.chains) as ex:
+                results = list(ex.map(
+                    _run_chain,
+                    seeds,
+                    per_chain,
+                    repeat(depot),
+                    repeat(vehicles),
+                    repeat(requests),
+                    repeat(D),
+                    repeat(idx),
+                    repeat(self.t0),
+                    repeat(self.alpha),
+                    repeat(self.patience),
+                    repeat(self.batch_size),
+                ))
+            best_cost, best_assignment = min(results, key=lambda res: res[0])
+
+        # Build the final Plan with the same routing the search priced
+        depot_i = idx[depot]
+        req_nodes, req_demands = request_tables(requests, idx)
+        nn_sorted = neighbor_order(D)
         routes: Dict[str, VehicleRoute] = {}
-        for v in vehicles:
-            reqs = best_state[v.id]
-            ordered = build_tsp_route_nearest_neighbor(depot, reqs, dist)
+        for v_i, v in enumerate(vehicles):
+            group = group_of(best_assignment, v_i)
+            order, _ = group_route(
+                depot_i, v.capacity, group, req_nodes, req_demands, D, nn_sorted
+            )
             routes[v.id] = VehicleRoute(
                 vehicle_id=v.id,
-                stops=ordered,
+                stops=[requests[i] for i in order],
             )
 
         plan = Plan(depot=depot, routes=routes)
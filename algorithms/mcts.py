@@ -5,7 +5,7 @@ import random
 
 from city.graph import CityGraph, NodeId
 from domain.models import Vehicle, DeliveryRequest, VehicleRoute, Plan
-from algorithms.a_star import astar_shortest_path
+from algorithms.a_star import astar_shortest_cost
 
 
 @dataclass
@@ -66,16 +66,16 @@ class MonteCarloVRP:
                 # If not enough capacity, return to depot and start a new trip
                 if cap_left < demand:
                     if cur != plan.depot:
-                        path, travel = astar_shortest_path(graph, cur, plan.depot)
-                        if path is None:
+                        travel = astar_shortest_cost(graph, cur, plan.depot)
+                        if travel is None:
                             return PlanCost(plan, float("inf"))
                         t += travel
                         cur = plan.depot
                     cap_left = cap
 
                 # Travel to the delivery location
-                path, travel = astar_shortest_path(graph, cur, req.node)
-                if path is None:
+                travel = astar_shortest_cost(graph, cur, req.node)
+                if travel is None:
                     return PlanCost(plan, float("inf"))
                 t += travel
                 cur = req.node
@@ -83,8 +83,8 @@ class MonteCarloVRP:
 
             # return to depot if required
             if return_to_depot and cur != plan.depot:
-                path, travel = astar_shortest_path(graph, cur, plan.depot)
-                if path is None:
+                travel = astar_shortest_cost(graph, cur, plan.depot)
+                if travel is None:
                     return PlanCost(plan, float("inf"))
                 t += travel
 
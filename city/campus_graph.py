@@ -1,8 +1,13 @@
+from functools import lru_cache
 from typing import Dict
 import math
 
 from city.graph import CityGraph, NodeId
 
+# The campus map is static, so it is built once and the same instance is shared
+# by every caller. Do not modify the returned graph in place; take a
+# copy.deepcopy() of it first if you need to add nodes or edges.
+@lru_cache(maxsize=1)
 def build_campus_graph() -> "CityGraph":
     g = CityGraph()
 
@@ -4,6 +4,7 @@ from typing import List
 import matplotlib.pyplot as plt
 
 from algorithms.grouping_monte_carlo import MonteCarloGroupingPlanner
+from algorithms.distances import build_planner_context
 from algorithms.basic import GreedyVRPPlanner
 
 from domain.models import Vehicle, DeliveryRequest
@@ -119,9 +120,12 @@ def main() -> None:
         print(f"  {r.id} -> node {r.node}")
     print()
 
+    # travel-time table shared by both planners
+    ctx = build_planner_context(graph, depot, vehicles, requests)
+
     # greedy
     greedy_planner = GreedyVRPPlanner()
-    greedy_result = greedy_planner.build_plan(graph, depot, vehicles, requests)
+    greedy_result = greedy_planner.build_plan(graph, depot, vehicles, requests, ctx=ctx)
     greedy_plan = greedy_result.plan
     print("[Greedy] deterministic total_time:", greedy_result.total_time)
     for vid, route in greedy_plan.routes.items():
@@ -130,7 +134,7 @@ def main() -> None:
 
     # monte carlo grouping
     mc_planner = MonteCarloGroupingPlanner(rng, iterations=2000)
-    mc_result = mc_planner.build_plan(graph, depot, vehicles, requests)
+    mc_result = mc_planner.build_plan(graph, depot, vehicles, requests, ctx=ctx)
     mc_plan = mc_result.plan
     print("[MonteCarlo] deterministic makespan_estimate:", mc_result.makespan_estimate)
     for vid, route in mc_plan.routes.items():